@@ -6,6 +6,19 @@ from dotenv import load_dotenv
 load_dotenv()
 
 
+def parse_cpus(spec: str) -> set[int]:
+    """Parse a core list like "0-2" or "0,1,3" into a set of core ids."""
+    cpus: set[int] = set()
+    for part in spec.split(","):
+        part = part.strip()
+        if "-" in part:
+            first, last = part.split("-", 1)
+            cpus.update(range(int(first), int(last) + 1))
+        elif part:
+            cpus.add(int(part))
+    return cpus
+
+
 class Settings:
     """Application settings loaded from .env file."""
 
@@ -16,10 +29,25 @@ class Settings:
     N_BATCH: int = int(os.getenv("N_BATCH", "256"))
     MAX_TOKENS: int = int(os.getenv("MAX_TOKENS", "256"))
     TEMPERATURE: float = float(os.getenv("TEMPERATURE", "0.7"))
+    # RAM for cached KV states (prompt prefix reuse across pipelines);
+    # 0 disables.  Opt-in: see the note in .env.example
+    LLM_CACHE_MB: int = int(os.getenv("LLM_CACHE_MB", "0"))
+
+    # CPU affinity (Linux core lists like "0-2" or "0,1,2"); empty disables.
+    # Pi 5 default: llama.cpp on cores 0-2, Whisper on core 3.
+    LLM_CPUS: str = os.getenv("LLM_CPUS", "0-2")
+    ASR_CPUS: str = os.getenv("ASR_CPUS", "3")
 
     # ASR
     WHISPER_MODEL: str = os.getenv("WHISPER_MODEL", "base")
     WHISPER_LANGUAGE: str = os.getenv("WHISPER_LANGUAGE", "es")
+    WHISPER_COMPUTE_TYPE: str = os.getenv("WHISPER_COMPUTE_TYPE", "int8")
+    # Default: one thread per ASR_CPUS core (Whisper is pinned there), or the
+    # cores not reserved for llama.cpp when pinning is disabled
+    WHISPER_CPU_THREADS: int = int(os.getenv(
+        "WHISPER_CPU_THREADS",
+        str(len(parse_cpus(ASR_CPUS)) or max(1, (os.cpu_count() or 4) - N_THREADS)),
+    ))
 
     # TTS
     PIPER_VOICE: str = os.getenv("PIPER_VOICE", "./voices/es_ES-davefx-medium.onnx")
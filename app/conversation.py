@@ -1,16 +1,78 @@
 """Per-project conversation history with sliding window and disk persistence.
 
-History survives server restarts by saving to JSON on the NVMe.
+History survives server restarts by appending each message to a
+per-project JSONL file on the NVMe.  Writes are O(1) regardless of
+how much history has accumulated, and happen on a background writer
+thread so disk latency never reaches the request path.
 """
 
-import json
+import queue
 import threading
 import logging
 from collections import deque
 from pathlib import Path
 
+import orjson
+
 logger = logging.getLogger(__name__)
 
+# ── Background writer ──────────────────────────────────────
+# A single daemon thread owns all history file I/O.  Requests only
+# enqueue (path, data, truncate) jobs; the worker drains whatever is
+# pending and writes it with one open() per file.
+
+_persist_queue: queue.Queue[tuple[Path, bytes, bool]] = queue.Queue()
+_persist_thread: threading.Thread | None = None
+_persist_start_lock = threading.Lock()
+
+
+def _write_batch(batch: list[tuple[Path, bytes, bool]]) -> None:
+    """Apply queued jobs in order, coalescing them per file."""
+    pending: dict[Path, tuple[bool, bytearray]] = {}
+    for path, data, truncate in batch:
+        if truncate or path not in pending:
+            # A truncate discards earlier appends to the same file
+            pending[path] = (truncate, bytearray(data))
+        else:
+            pending[path][1].extend(data)
+    for path, (truncate, data) in pending.items():
+        try:
+            with path.open("wb" if truncate else "ab") as f:
+                f.write(data)
+        except Exception as e:
+            logger.warning("Failed to save history to %s: %s", path, e)
+
+
+def _persist_worker() -> None:
+    while True:
+        batch = [_persist_queue.get()]
+        while True:
+            try:
+                batch.append(_persist_queue.get_nowait())
+            except queue.Empty:
+                break
+        _write_batch(batch)
+        for _ in batch:
+            _persist_queue.task_done()
+
+
+def _enqueue_write(path: Path, data: bytes, truncate: bool = False) -> None:
+    global _persist_thread
+    if _persist_thread is None:
+        with _persist_start_lock:
+            if _persist_thread is None:
+                _persist_thread = threading.Thread(
+                    target=_persist_worker, name="history-writer", daemon=True
+                )
+                _persist_thread.start()
+    _persist_queue.put((path, data, truncate))
+
+
+def flush_history() -> None:
+    """Block until every queued history write has reached the disk."""
+    if _persist_thread is not None:
+        _persist_queue.join()
+
 
 class ConversationManager:
     """Manages conversation history for a single project (robot or assistant).
@@ -18,7 +80,8 @@ class ConversationManager:
     Uses a deque with fixed max length to implement a sliding window that
     automatically discards the oldest messages when the limit is reached.
     Thread-safe for concurrent access.
-    Persists history to a JSON file on disk after each exchange.
+    Appends each exchange to ``<HISTORY_FILE stem>.<name>.jsonl`` on disk,
+    one JSON message per line, via the background writer thread.
     """
 
     def __init__(self, name: str, system_prompt: str, max_turns: int = 10,
@@ -28,47 +91,100 @@ class ConversationManager:
         self.max_turns = max_turns
         self.history: deque = deque(maxlen=max_turns * 2)
         self._lock = threading.Lock()
-        self._persist_path = persist_path
+        self._persist_path: Path | None = None
+        self._legacy_path: Path | None = None
 
         # Load history from disk if available
         if persist_path:
+            base = Path(persist_path)
+            self._persist_path = base.with_name(f"{base.stem}.{name}.jsonl")
+            # Older versions kept every project in one JSON file at ``base``
+            if base != self._persist_path:
+                self._legacy_path = base
             self._load_from_disk()
 
     def _load_from_disk(self) -> None:
-        """Load history from JSON file if it exists."""
+        """Stream history from the JSONL file if it exists.
+
+        Only the last ``max_turns`` exchanges are kept in memory.  Lines
+        that cannot be parsed (typically the last one, cut short by a
+        power loss mid-write) are skipped.  The file is compacted to the
+        retained window when it held more than that or had bad lines, so
+        it neither grows without bound nor keeps a torn line that the
+        next append would be glued onto.
+        """
+        path = self._persist_path
+        if not path.exists():
+            self._import_legacy()
+            return
+        total = 0
+        skipped = 0
         try:
-            path = Path(self._persist_path)
-            if path.exists():
-                data = json.loads(path.read_text(encoding="utf-8"))
-                items = data.get(self.name, [])
-                for item in items:
-                    self.history.append(item)
-                logger.info("[%s] Loaded %d messages from disk", self.name, len(items))
-        except Exception as e:
+            with path.open("rb") as f:
+                for lineno, line in enumerate(f, 1):
+                    if not line.strip():
+                        continue
+                    try:
+                        message = orjson.loads(line)
+                    except orjson.JSONDecodeError as e:
+                        logger.warning("[%s] Skipping unreadable line %d of %s: %s",
+                                       self.name, lineno, path, e)
+                        skipped += 1
+                        continue
+                    self.history.append(message)
+                    total += 1
+        except OSError as e:
             logger.warning("[%s] Failed to load history: %s", self.name, e)
+            return
+        logger.info("[%s] Loaded %d messages from disk", self.name, len(self.history))
+        if skipped or total > len(self.history):
+            self._rewrite_disk()
 
-    def _save_to_disk(self) -> None:
-        """Persist current history to JSON file."""
-        if not self._persist_path:
+    def _import_legacy(self) -> None:
+        """Import this project's history from the old shared JSON file.
+
+        Runs only while the JSONL file does not exist yet; the rewrite
+        creates it, so the import happens once.  The legacy file is left
+        in place for the other projects.
+        """
+        legacy = self._legacy_path
+        if legacy is None or not legacy.is_file():
             return
         try:
-            path = Path(self._persist_path)
-            # Read existing data to preserve other project's history
-            existing = {}
-            if path.exists():
-                existing = json.loads(path.read_text(encoding="utf-8"))
-            existing[self.name] = list(self.history)
-            path.write_text(json.dumps(existing, ensure_ascii=False, indent=2),
-                            encoding="utf-8")
-        except Exception as e:
-            logger.warning("[%s] Failed to save history: %s", self.name, e)
+            items = orjson.loads(legacy.read_bytes()).get(self.name, [])
+        except (OSError, orjson.JSONDecodeError, AttributeError) as e:
+            logger.warning("[%s] Failed to import legacy history from %s: %s",
+                           self.name, legacy, e)
+            return
+        self.history.extend(items)
+        logger.info("[%s] Imported %d messages from %s",
+                    self.name, len(self.history), legacy)
+        self._rewrite_disk()
+
+    def _rewrite_disk(self) -> None:
+        """Queue a rewrite of the JSONL file with the current window."""
+        if not self._persist_path:
+            return
+        data = b"".join(orjson.dumps(m, option=orjson.OPT_APPEND_NEWLINE)
+                        for m in self.history)
+        _enqueue_write(self._persist_path, data, truncate=True)
+
+    def _append_to_disk(self, *messages: dict) -> None:
+        """Queue messages to be appended to the JSONL file, one per line."""
+        if not self._persist_path:
+            return
+        data = b"".join(orjson.dumps(m, option=orjson.OPT_APPEND_NEWLINE)
+                        for m in messages)
+        _enqueue_write(self._persist_path, data)
 
     def add_exchange(self, user_text: str, assistant_text: str) -> None:
         """Record a complete user/assistant exchange and persist."""
+        user_msg = {"role": "user", "content": user_text}
+        assistant_msg = {"role": "assistant", "content": assistant_text}
         with self._lock:
-            self.history.append({"role": "user", "content": user_text})
-            self.history.append({"role": "assistant", "content": assistant_text})
-            self._save_to_disk()
+            self.history.append(user_msg)
+            self.history.append(assistant_msg)
+            self._append_to_disk(user_msg, assistant_msg)
 
     def get_messages(self, user_text: str) -> list[dict]:
         """Build the full message list for the LLM."""
@@ -82,4 +198,4 @@ class ConversationManager:
         """Clear all conversation history (memory and disk)."""
         with self._lock:
             self.history.clear()
-            self._save_to_disk()
+            self._rewrite_disk()
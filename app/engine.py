@@ -4,28 +4,142 @@ methods for ASR, LLM generation (blocking and streaming), and TTS synthesis.
 Key optimization: generate_stream() yields audio chunks as the LLM
 produces sentences, allowing the ESP32 to start playback while the
 LLM is still generating. This cuts perceived latency by 40-60%.
+
+The heavy ML libraries (llama-cpp, faster-whisper, Piper, and numpy for
+ASR) are imported inside load_all() and only for the models the active
+pipelines need, so a bare /health server never pays for them.
 """
 
+from __future__ import annotations
+
 import io
+import os
 import wave
 import struct
-import tempfile
 import logging
 import re
-from typing import Iterator
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, BinaryIO, Iterator
 
-from llama_cpp import Llama
-from faster_whisper import WhisperModel
+from .config import parse_cpus, settings
 
-from .config import settings
+if TYPE_CHECKING:
+    import numpy as np
+    from llama_cpp import Llama, LlamaGrammar
+    from faster_whisper import WhisperModel
 
 logger = logging.getLogger(__name__)
 
 # Regex to strip <think>...</think> blocks from Qwen 3 output
 THINK_PATTERN = re.compile(r"<think>.*?</think>", re.DOTALL)
+THINK_CLOSE = "</think>"
+
+# Streaming scanner: think tags (groups 1 and 2) and Spanish sentence
+# boundaries (. ! ? ; and newlines) in a single compiled alternation, so
+# each streamed character is scanned once
+STREAM_MARKERS = re.compile(r'(<think>)|(</think>)|[.!?;。]\s*|\n')
+
+# Whisper expects mono float32 audio at 16 kHz
+WHISPER_SAMPLE_RATE = 16000
 
-# Sentence boundary detection for Spanish — split on . ! ? ; and newlines
-SENTENCE_END = re.compile(r'[.!?;。]\s*|\n')
+
+@contextmanager
+def _pinned(cpus: set[int]) -> Iterator[None]:
+    """Restrict the calling thread to *cpus* for the duration of the block.
+
+    Threads created inside the block (llama.cpp's OpenMP team, the
+    CTranslate2 worker) inherit the mask, which keeps each model's
+    threads on their own cores.  Best effort: no-op when *cpus* is empty,
+    on non-Linux systems, or when none of the cores exist.
+    """
+    if not cpus or not hasattr(os, "sched_setaffinity"):
+        yield
+        return
+    previous = os.sched_getaffinity(0)
+    allowed = cpus & previous
+    if not allowed:
+        logger.warning("CPU affinity %s not available (have %s) — not pinning",
+                       sorted(cpus), sorted(previous))
+        yield
+        return
+    os.sched_setaffinity(0, allowed)
+    try:
+        yield
+    finally:
+        os.sched_setaffinity(0, previous)
+
+
+def _wav_header(sample_rate: int, data_size: int) -> bytes:
+    """Build a 44-byte mono 16-bit PCM WAV header.
+
+    ``data_size`` 0xFFFFFFFF marks a stream of unknown length (the RIFF
+    size is saturated to match).
+    """
+    riff_size = min(36 + data_size, 0xFFFFFFFF)
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", riff_size, b"WAVE",
+        b"fmt ", 16, 1, 1, sample_rate, sample_rate * 2, 2, 16,
+        b"data", data_size,
+    )
+
+
+def _find_pcm16(data: memoryview) -> tuple[int, int, int] | None:
+    """Locate the samples of a 16 kHz 16-bit PCM WAV without copying.
+
+    Walks the RIFF chunks and returns ``(channels, offset, n_samples)`` of
+    the ``data`` chunk, or None if the buffer is not in that format.
+    """
+    if len(data) < 12 or data[0:4] != b"RIFF" or data[8:12] != b"WAVE":
+        return None
+    channels = None
+    pos = 12
+    while pos + 8 <= len(data):
+        chunk_id = data[pos:pos + 4]
+        (size,) = struct.unpack_from("<I", data, pos + 4)
+        body = pos + 8
+        if chunk_id == b"fmt " and size >= 16:
+            fmt_tag, n_channels, rate = struct.unpack_from("<HHI", data, body)
+            (bits,) = struct.unpack_from("<H", data, body + 14)
+            if fmt_tag != 1 or bits != 16 or rate != WHISPER_SAMPLE_RATE:
+                return None
+            channels = n_channels
+        elif chunk_id == b"data":
+            if not channels:
+                return None
+            # Streamed or truncated uploads may declare a bogus size
+            size = min(size, len(data) - body)
+            return channels, body, size // (2 * channels) * channels
+        pos = body + size + (size & 1)
+    return None
+
+
+def _decode_wav(audio_bytes: bytes | bytearray | memoryview) -> np.ndarray:
+    """Decode WAV bytes into a mono float32 array at 16 kHz, in memory.
+
+    The ESP32 sends 16 kHz 16-bit PCM, whose samples are viewed in place
+    with np.frombuffer (no copy) and converted to float32 in one pass.
+    Any other format (different rate, sample width or codec) falls back
+    to faster-whisper's PyAV decoder, which also resamples.
+    """
+    import numpy as np
+
+    data = memoryview(audio_bytes).cast("B")
+    found = _find_pcm16(data)
+    if found is None:
+        from faster_whisper import decode_audio
+
+        return decode_audio(io.BytesIO(data), sampling_rate=WHISPER_SAMPLE_RATE)
+
+    channels, offset, n_samples = found
+    samples = np.frombuffer(data, dtype="<i2", count=n_samples, offset=offset)
+    audio = samples.astype(np.float32)
+    audio *= 1.0 / 32768.0
+    if channels > 1:
+        audio = audio.reshape(-1, channels).mean(axis=1)
+    return audio
 
 
 class InferenceEngine:
@@ -33,90 +147,195 @@ class InferenceEngine:
 
     All models are loaded once at startup and reused across requests.
     Thread safety is handled at the FastAPI level with asyncio.Lock.
+    Blocking inference calls run on ``executor``, a small dedicated
+    thread pool set up by the server at startup.
     """
 
     def __init__(self):
         self.llm: Llama | None = None
         self.whisper: WhisperModel | None = None
         self.tts_voice = None  # PiperVoice | None — imported conditionally
+        self._llm_cpus = parse_cpus(settings.LLM_CPUS)
+        self._asr_cpus = parse_cpus(settings.ASR_CPUS)
+        self._wav_header = b""
+        self._stream_wav_header = b""
+        self.executor: ThreadPoolExecutor | None = None
+        # Piper phonemizes through espeak-ng, which keeps process-global
+        # voice state, so TTS calls from concurrent requests take turns
+        self._tts_lock = threading.Lock()
         self._ready = False
 
-    def load_all(self, requires_tts: bool = True) -> None:
+    def load_all(self, requires_llm: bool = True, requires_asr: bool = True,
+                 requires_tts: bool = True) -> None:
         """Load models into memory. Called once at server startup.
 
+        Each model is only imported and loaded if some active pipeline
+        needs it.  Flags are set automatically from the pipelines'
+        ``requires_*`` attributes.
+
         Args:
+            requires_llm: If False, skip loading the LLM (~1.2 GB of RAM).
+            requires_asr: If False, skip loading Whisper (~200 MB of RAM).
             requires_tts: If False, skip loading Piper TTS to save ~60 MB
-                          of RAM. Set automatically based on which pipelines
-                          are active.
+                          of RAM.
         """
 
-        logger.info("Loading LLM: %s (threads=%d, ctx=%d, batch=%d)",
-                     settings.MODEL_PATH, settings.N_THREADS,
-                     settings.N_CTX, settings.N_BATCH)
-        self.llm = Llama(
-            model_path=settings.MODEL_PATH,
-            n_threads=settings.N_THREADS,
-            n_ctx=settings.N_CTX,
-            n_batch=settings.N_BATCH,
-            n_gpu_layers=0,
-            verbose=False,
-        )
+        if requires_llm:
+            from llama_cpp import Llama
+
+            logger.info("Loading LLM: %s (threads=%d, ctx=%d, batch=%d)",
+                         settings.MODEL_PATH, settings.N_THREADS,
+                         settings.N_CTX, settings.N_BATCH)
+            self.llm = Llama(
+                model_path=settings.MODEL_PATH,
+                n_threads=settings.N_THREADS,
+                n_ctx=settings.N_CTX,
+                n_batch=settings.N_BATCH,
+                n_gpu_layers=0,
+                verbose=False,
+            )
 
-        logger.info("Loading Whisper model: %s (lang=%s)",
-                     settings.WHISPER_MODEL, settings.WHISPER_LANGUAGE)
-        self.whisper = WhisperModel(
-            settings.WHISPER_MODEL,
-            device="cpu",
-            compute_type="int8",
-            cpu_threads=4,
-        )
+            # Keep KV states of recent prompts in RAM.  On each request
+            # llama-cpp restores the cached state sharing the longest token
+            # prefix (system prompt + history) and only prefills the new
+            # tokens, instead of re-evaluating the whole conversation.  The
+            # cache is keyed by tokens, so robot and assistant conversations
+            # each keep their own prefix even when requests alternate.
+            # Opt-in: the state is saved after every completion, with a
+            # copy of the logits (n_batch x n_vocab floats) that the
+            # capacity does not count, and back-to-back turns of one
+            # pipeline already reuse the prefix left in the context.
+            if settings.LLM_CACHE_MB > 0:
+                from llama_cpp import LlamaRAMCache
+
+                logger.info("LLM prompt cache: %d MB", settings.LLM_CACHE_MB)
+                self.llm.set_cache(
+                    LlamaRAMCache(capacity_bytes=settings.LLM_CACHE_MB << 20)
+                )
+        else:
+            logger.info("LLM not required by any pipeline — skipping llama-cpp")
+
+        if requires_asr:
+            import numpy as np
+            from faster_whisper import WhisperModel
+
+            logger.info("Loading Whisper model: %s (lang=%s, compute=%s, threads=%d)",
+                         settings.WHISPER_MODEL, settings.WHISPER_LANGUAGE,
+                         settings.WHISPER_COMPUTE_TYPE, settings.WHISPER_CPU_THREADS)
+            # Keep Whisper off the LLM's cores: cpu_threads defaults to the
+            # cores llama.cpp leaves free, and the CTranslate2 worker and
+            # compute threads, created here and on the first transcription,
+            # inherit the ASR affinity.  The warm-up also pre-faults the
+            # weights.
+            with _pinned(self._asr_cpus):
+                self.whisper = WhisperModel(
+                    settings.WHISPER_MODEL,
+                    device="cpu",
+                    compute_type=settings.WHISPER_COMPUTE_TYPE,
+                    cpu_threads=settings.WHISPER_CPU_THREADS,
+                    num_workers=1,
+                )
+                segments, _ = self.whisper.transcribe(
+                    np.zeros(WHISPER_SAMPLE_RATE, dtype=np.float32),
+                    language=settings.WHISPER_LANGUAGE,
+                    beam_size=1,
+                )
+                list(segments)
+        else:
+            logger.info("ASR not required by any pipeline — skipping Whisper")
 
         if requires_tts:
             from piper.voice import PiperVoice
 
             logger.info("Loading Piper voice: %s", settings.PIPER_VOICE)
             self.tts_voice = PiperVoice.load(settings.PIPER_VOICE)
+
+            # The WAV format is fixed for the life of the process
+            sample_rate = self.tts_voice.config.sample_rate
+            self._wav_header = _wav_header(sample_rate, 0)
+            self._stream_wav_header = _wav_header(sample_rate, 0xFFFFFFFF)
         else:
             logger.info("TTS not required by any pipeline — skipping Piper")
 
         self._ready = True
         logger.info("All required models loaded successfully")
 
+    def prime_prompt(self, system_prompt: str) -> None:
+        """Prefill a system prompt once so its KV state is in the prompt cache.
+
+        System prompts are constant for the life of the process, so the
+        first request of each pipeline can reuse the cached prefix instead
+        of tokenizing and evaluating the whole prompt on the request path.
+        No-op when the prompt cache is disabled.
+        """
+        if self.llm is None or self.llm.cache is None:
+            return
+        with _pinned(self._llm_cpus):
+            self.llm.create_chat_completion(
+                messages=[{"role": "system", "content": system_prompt}],
+                max_tokens=1,
+            )
+
     def is_ready(self) -> bool:
         return self._ready
 
+    @property
+    def llm_loaded(self) -> bool:
+        return self.llm is not None
+
+    @property
+    def asr_loaded(self) -> bool:
+        return self.whisper is not None
+
     @property
     def tts_loaded(self) -> bool:
         return self.tts_voice is not None
 
     # ── ASR ─────────────────────────────────────────────────
 
-    def transcribe(self, audio_bytes: bytes) -> str:
-        """ASR: Convert audio bytes (WAV) to Spanish text."""
-        with tempfile.NamedTemporaryFile(suffix=".wav", delete=True) as tmp:
-            tmp.write(audio_bytes)
-            tmp.flush()
-
-            segments, info = self.whisper.transcribe(
-                tmp.name,
-                language=settings.WHISPER_LANGUAGE,
-                beam_size=1,
-                best_of=1,
-                temperature=0.0,
-                vad_filter=True,
-                vad_parameters=dict(
-                    min_silence_duration_ms=500,
-                    speech_pad_ms=200,
-                ),
-                condition_on_previous_text=False,
-                without_timestamps=True,
-                word_timestamps=False,
-            )
-            return " ".join(seg.text.strip() for seg in segments)
+    def transcribe(self, audio: bytes | BinaryIO) -> str:
+        """ASR: Convert audio (WAV bytes or a binary file) to Spanish text.
+
+        Endpoints pass the upload's file object, so reading it happens
+        here, on the executor thread, rather than on the event loop.
+        The WAV is decoded in memory and handed to Whisper as a numpy
+        array, avoiding a temp-file round-trip on every request.
+        """
+        if hasattr(audio, "read"):
+            audio = audio.read()
+        segments, info = self.whisper.transcribe(
+            _decode_wav(audio),
+            language=settings.WHISPER_LANGUAGE,
+            beam_size=1,
+            best_of=1,
+            temperature=0.0,
+            vad_filter=True,
+            vad_parameters=dict(
+                min_silence_duration_ms=500,
+                speech_pad_ms=200,
+            ),
+            condition_on_previous_text=False,
+            without_timestamps=True,
+            word_timestamps=False,
+        )
+        return " ".join(seg.text.strip() for seg in segments)
 
     # ── LLM (blocking — for robot JSON mode) ───────────────
 
-    def generate(self, messages: list[dict], json_mode: bool = False) -> str:
+    def compile_grammar(self, gbnf: str) -> LlamaGrammar:
+        """Build a LlamaGrammar from GBNF text, for reuse across generate() calls.
+
+        Pipelines call this at route registration (after the models are
+        loaded) to constrain the LLM to their exact output schema.  In
+        llama-cpp-python 0.3.x the object only holds the text and the
+        grammar is still parsed on every call, so reuse saves no parsing.
+        """
+        from llama_cpp import LlamaGrammar
+
+        return LlamaGrammar.from_string(gbnf, verbose=False)
+
+    def generate(self, messages: list[dict], json_mode: bool = False,
+                 grammar: LlamaGrammar | None = None) -> str:
         """LLM: Generate a complete text response (non-streaming).
         Used for robot commands where we need the full JSON response
         before parsing.
@@ -124,6 +343,9 @@ class InferenceEngine:
         Args:
             messages: Chat messages including system prompt and history.
             json_mode: If True, constrain output to valid JSON.
+            grammar:   Grammar from compile_grammar() that
+                       constrains the output; takes precedence over
+                       json_mode.
 
         Returns:
             The generated text, with any <think> blocks stripped.
@@ -137,10 +359,13 @@ class InferenceEngine:
             presence_penalty=1.5,
         )
 
-        if json_mode:
+        if grammar is not None:
+            kwargs["grammar"] = grammar
+        elif json_mode:
             kwargs["response_format"] = {"type": "json_object"}
 
-        result = self.llm.create_chat_completion(**kwargs)
+        with _pinned(self._llm_cpus):
+            result = self.llm.create_chat_completion(**kwargs)
         content = result["choices"][0]["message"]["content"] or ""
         content = THINK_PATTERN.sub("", content).strip()
         return content
@@ -171,39 +396,49 @@ class InferenceEngine:
         )
 
         buffer = ""
-        in_think_block = False
-
-        for chunk in stream:
-            delta = chunk["choices"][0]["delta"]
-            token = delta.get("content", "")
-            if not token:
-                continue
-
-            # Track and skip <think>...</think> blocks
-            buffer += token
-            if "<think>" in buffer and not in_think_block:
-                in_think_block = True
-            if in_think_block:
-                if "</think>" in buffer:
-                    # Remove the entire think block
-                    buffer = THINK_PATTERN.sub("", buffer)
-                    in_think_block = False
-                else:
-                    continue  # Still inside think block, don't yield
-
-            # Check for sentence boundary
-            match = SENTENCE_END.search(buffer)
-            if match:
-                # Yield everything up to and including the sentence end
-                end_pos = match.end()
-                sentence = buffer[:end_pos].strip()
-                buffer = buffer[end_pos:]
-                if sentence:
-                    yield sentence
+        scan_from = 0   # buffer[:scan_from] has already been scanned
+        think_start: int | None = None
+
+        # Tokens are decoded lazily while iterating, so pin the iteration
+        with _pinned(self._llm_cpus):
+            for chunk in stream:
+                delta = chunk["choices"][0]["delta"]
+                token = delta.get("content", "")
+                if not token:
+                    continue
+
+                buffer += token
+                # One pass over the new text finds think tags and sentence ends
+                # alike.  Back up a little so a tag split across tokens is found.
+                pos = max(0, scan_from - len(THINK_CLOSE) + 1)
+                while (match := STREAM_MARKERS.search(buffer, pos)) is not None:
+                    if match.lastindex == 1:  # <think>
+                        if think_start is None:
+                            think_start = match.start()
+                        pos = match.end()
+                    elif match.lastindex == 2:  # </think>
+                        if think_start is None:
+                            pos = match.end()
+                            continue
+                        # Remove the entire think block
+                        buffer = buffer[:think_start] + buffer[match.end():]
+                        pos = think_start
+                        think_start = None
+                    elif think_start is not None:
+                        pos = match.end()  # Still inside think block, don't yield
+                    else:
+                        # Yield everything up to and including the sentence end
+                        end_pos = match.end()
+                        sentence = buffer[:end_pos].strip()
+                        buffer = buffer[end_pos:]
+                        pos = 0
+                        if sentence:
+                            yield sentence
+                scan_from = len(buffer)
 
         # Yield any remaining text
         remaining = buffer.strip()
-        if remaining and not in_think_block:
+        if remaining and think_start is None:
             yield remaining
 
     # ── TTS ─────────────────────────────────────────────────
@@ -215,25 +450,33 @@ class InferenceEngine:
             wav_file.setnchannels(1)
             wav_file.setsampwidth(2)
             wav_file.setframerate(self.tts_voice.config.sample_rate)
-            self.tts_voice.synthesize(text, wav_file, sentence_silence=0.2)
+            with self._tts_lock:
+                self.tts_voice.synthesize(text, wav_file, sentence_silence=0.2)
         return buffer.getvalue()
 
     def synthesize_raw(self, text: str) -> bytes:
         """TTS: Convert text to raw PCM int16 bytes (no WAV header).
         Used for streaming — individual chunks that will be assembled
         into a WAV by the endpoint."""
-        pcm_data = b""
-        for audio_bytes in self.tts_voice.synthesize_stream_raw(text):
-            pcm_data += audio_bytes
-        return pcm_data
+        with self._tts_lock:
+            return b"".join(self.tts_voice.synthesize_stream_raw(text))
+
+    def stream_wav_header(self) -> bytes:
+        """Return a 44-byte WAV header for PCM of unknown length.
+
+        The RIFF and data sizes are set to 0xFFFFFFFF, the usual marker
+        for a streamed WAV whose total length is not known up front.
+        """
+        return self._stream_wav_header
 
     def pcm_to_wav(self, pcm_chunks: list[bytes]) -> bytes:
-        """Assemble raw PCM chunks into a complete WAV file."""
-        all_pcm = b"".join(pcm_chunks)
-        buffer = io.BytesIO()
-        with wave.open(buffer, "wb") as wav_file:
-            wav_file.setnchannels(1)
-            wav_file.setsampwidth(2)
-            wav_file.setframerate(self.tts_voice.config.sample_rate)
-            wav_file.writeframes(all_pcm)
-        return buffer.getvalue()
+        """Assemble raw PCM chunks into a complete WAV file.
+
+        Stamps the RIFF and data sizes into a copy of the cached header
+        and joins it with the chunks in a single copy.
+        """
+        data_size = sum(len(chunk) for chunk in pcm_chunks)
+        header = bytearray(self._wav_header)
+        struct.pack_into("<I", header, 4, 36 + data_size)
+        struct.pack_into("<I", header, 40, data_size)
+        return b"".join((header, *pcm_chunks))
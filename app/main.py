@@ -2,7 +2,7 @@
 
 Pipelines are loaded dynamically based on the PIPELINES setting
 in .env.  Each pipeline registers its own FastAPI endpoints and
-declares its model requirements (e.g. TTS).  The server only
+declares its model requirements (ASR, LLM, TTS).  The server only
 loads the models that the active pipelines actually need.
 
 Set PIPELINES=robot,assistant to load both, PIPELINES=robot for
@@ -15,13 +15,14 @@ import inspect
 import os
 import time
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 
 from .config import settings
 from .engine import InferenceEngine
-from .conversation import ConversationManager
+from .conversation import ConversationManager, flush_history
 from .pipeline import Pipeline
 
 logging.basicConfig(
@@ -36,7 +37,7 @@ engine = InferenceEngine()
 # asyncio.Lock prevents concurrent LLM access while keeping
 # the event loop responsive for /health and other endpoints
 llm_lock = asyncio.Lock()
-start_time = time.time()
+start_time = time.monotonic()
 
 # Filled during lifespan — pipeline names that were loaded
 loaded_pipeline_names: list[str] = []
@@ -88,12 +89,18 @@ async def lifespan(app: FastAPI):
     # Discover and instantiate pipeline classes
     pipelines = _discover_pipelines(names)
 
-    if pipelines:
-        # Determine which models are needed
-        requires_tts = any(p.requires_tts for p in pipelines)
+    # Dedicated pool for blocking inference, one worker per model stage
+    # (ASR, LLM, TTS).  The default executor (min(32, cpu+4) threads) would
+    # let more C++ workloads run at once than the Pi's 4 cores can serve.
+    engine.executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix="engine")
 
-        # Load models
-        engine.load_all(requires_tts=requires_tts)
+    if pipelines:
+        # Load only the models the active pipelines need
+        engine.load_all(
+            requires_llm=any(p.requires_llm for p in pipelines),
+            requires_asr=any(p.requires_asr for p in pipelines),
+            requires_tts=any(p.requires_tts for p in pipelines),
+        )
 
         # Register each pipeline's routes
         for pipeline in pipelines:
@@ -104,15 +111,20 @@ async def lifespan(app: FastAPI):
                 persist_path=settings.HISTORY_FILE,
             )
             pipeline.register_routes(app, engine, convo, llm_lock)
+            if pipeline.requires_llm:
+                engine.prime_prompt(pipeline.system_prompt)
             loaded_pipeline_names.append(pipeline.name)
-            logger.info("Pipeline '%s' loaded (tts=%s)",
-                        pipeline.name, pipeline.requires_tts)
+            logger.info("Pipeline '%s' loaded (asr=%s, llm=%s, tts=%s)",
+                        pipeline.name, pipeline.requires_asr,
+                        pipeline.requires_llm, pipeline.requires_tts)
 
     logger.info("Server ready on %s:%d — pipelines: %s",
                 settings.HOST, settings.PORT,
                 loaded_pipeline_names or ["none"])
     yield
     logger.info("Shutting down")
+    engine.executor.shutdown(wait=True)
+    flush_history()
 
 
 app = FastAPI(
@@ -130,11 +142,11 @@ async def health():
     return {
         "status": "ok",
         "models_loaded": engine.is_ready(),
-        "uptime_seconds": int(time.time() - start_time),
+        "uptime_seconds": int(time.monotonic() - start_time),
         "pipelines": loaded_pipeline_names,
         "config": {
-            "llm": settings.MODEL_PATH.split("/")[-1],
-            "whisper": settings.WHISPER_MODEL,
+            "llm": settings.MODEL_PATH.split("/")[-1] if engine.llm_loaded else "not loaded",
+            "whisper": settings.WHISPER_MODEL if engine.asr_loaded else "not loaded",
             "tts": settings.PIPER_VOICE.split("/")[-1] if engine.tts_loaded else "not loaded",
         },
     }
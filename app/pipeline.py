@@ -27,12 +27,16 @@ class Pipeline:
         name:              Short identifier (e.g. "robot", "assistant").
         system_prompt:     Default LLM system prompt.  Can be overridden
                            via the ``<NAME>_SYSTEM_PROMPT`` env var.
+        requires_asr:      True if any endpoint needs Whisper ASR.
+        requires_llm:      True if any endpoint needs the LLM.
         requires_tts:      True if any endpoint needs Piper TTS.
         max_history_turns: Conversation history sliding-window size.
     """
 
     name: str = ""
     system_prompt: str = ""
+    requires_asr: bool = True
+    requires_llm: bool = True
     requires_tts: bool = False
     max_history_turns: int = 10
 
@@ -7,7 +7,7 @@ latency by 40-60% compared to waiting for the full LLM response.
 
 Endpoints:
     POST /assistant/chat        — audio WAV -> audio WAV (streaming LLM->TTS)
-    POST /assistant/chat/stream — audio WAV -> chunked binary audio
+    POST /assistant/chat/stream — audio WAV -> WAV header + chunked PCM
     POST /assistant/chat/text   — audio WAV -> JSON text (debug)
     POST /assistant/reset       — clear conversation history
 """
@@ -15,7 +15,9 @@ Endpoints:
 from __future__ import annotations
 
 import asyncio
+import queue
 import struct
+import threading
 import time
 import logging
 
@@ -34,6 +36,13 @@ _DEFAULT_SYSTEM_PROMPT = (
     "No uses emojis, markdown, listas, ni formato especial. /no_think"
 )
 
+# /assistant/chat synthesizes sentences arriving within this window (up to
+# _TTS_BATCH_MAX of them) in a single Piper call, amortizing per-call
+# ONNX Runtime overhead.  The streaming endpoint does not batch, to keep
+# time to first audio minimal.
+_TTS_BATCH_WINDOW = 0.02  # seconds
+_TTS_BATCH_MAX = 3
+
 
 class AssistantPipeline(Pipeline):
     """Conversational voice assistant with streaming TTS output."""
@@ -57,21 +66,22 @@ class AssistantPipeline(Pipeline):
 
             Pipeline:
             1. ASR: Audio -> text
-            2. LLM streaming: text -> sentences (yielded one at a time)
-            3. TTS: Each sentence -> PCM audio (synthesized while LLM continues)
+            2. LLM streaming: text -> sentences (producer thread)
+            3. TTS: Each sentence -> PCM audio (consumer, runs while LLM continues)
             4. Assembly: All PCM chunks -> single WAV response
 
             The streaming pipeline reduces perceived latency by 40-60% compared
             to waiting for the full LLM response before starting TTS.
             """
-            total_start = time.time()
-            audio_bytes = await audio.read()
+            total_start = time.perf_counter()
             loop = asyncio.get_running_loop()
 
             # Step 1: ASR
-            asr_start = time.time()
-            text = await loop.run_in_executor(None, engine.transcribe, audio_bytes)
-            asr_time = time.time() - asr_start
+            asr_start = time.perf_counter()
+            text = await loop.run_in_executor(
+                engine.executor, engine.transcribe, audio.file
+            )
+            asr_time = time.perf_counter() - asr_start
 
             if not text or not text.strip():
                 raise HTTPException(status_code=400, detail="No speech detected")
@@ -80,27 +90,59 @@ class AssistantPipeline(Pipeline):
 
             # Step 2+3: Stream LLM -> TTS sentence by sentence
             messages = convo.get_messages(text)
-            pcm_chunks: list[bytes] = []
-            full_response = ""
-            llm_start = time.time()
+            llm_start = time.perf_counter()
 
-            async with llm_lock:
-                # Stream sentences from LLM and synthesize each one immediately
-                def stream_and_synthesize():
-                    chunks = []
-                    response_parts = []
-                    for sentence in engine.generate_stream(messages):
-                        response_parts.append(sentence)
-                        logger.info("[Assistant] Sentence: %s", sentence[:80])
-                        pcm = engine.synthesize_raw(sentence)
-                        chunks.append(pcm)
-                    return chunks, " ".join(response_parts)
-
-                pcm_chunks, full_response = await loop.run_in_executor(
-                    None, stream_and_synthesize
-                )
+            # The LLM decodes in a producer thread while a consumer thread
+            # synthesizes each sentence, so decode and TTS overlap
+            sentences: queue.Queue[str | None] = queue.Queue()
 
-            llm_tts_time = time.time() - llm_start
+            def produce():
+                try:
+                    for sentence in engine.generate_stream(messages):
+                        sentences.put(sentence)
+                finally:
+                    sentences.put(None)
+
+            def synthesize_all():
+                chunks = []
+                response_parts = []
+                done = False
+                while not done and (sentence := sentences.get()) is not None:
+                    # Coalesce sentences that arrive back-to-back (short
+                    # ones like "Claro.") into one Piper call
+                    batch = [sentence]
+                    deadline = time.monotonic() + _TTS_BATCH_WINDOW
+                    while len(batch) < _TTS_BATCH_MAX:
+                        try:
+                            following = sentences.get(
+                                timeout=max(0.0, deadline - time.monotonic())
+                            )
+                        except queue.Empty:
+                            break
+                        if following is None:
+                            done = True
+                            break
+                        batch.append(following)
+
+                    response_parts.extend(batch)
+                    text_batch = " ".join(batch)
+                    logger.info("[Assistant] Sentence: %s", text_batch[:80])
+                    chunks.append(engine.synthesize_raw(text_batch))
+                return chunks, " ".join(response_parts)
+
+            # Only LLM decoding is serialized: the lock is released as soon
+            # as the producer finishes, while TTS of the last sentences
+            # (and other requests' ASR/TTS) carry on without it
+            await llm_lock.acquire()
+            producer = loop.run_in_executor(engine.executor, produce)
+            producer.add_done_callback(lambda _: llm_lock.release())
+
+            consumer = loop.run_in_executor(engine.executor, synthesize_all)
+            # Await both, so an LLM or Piper error is raised and the other
+            # future's outcome is never left unretrieved
+            _, (pcm_chunks, full_response) = await asyncio.gather(producer, consumer)
+
+            llm_tts_time = time.perf_counter() - llm_start
             logger.info("[Assistant] LLM+TTS streaming (%.2fs): %s",
                         llm_tts_time, full_response[:120])
 
@@ -108,7 +150,7 @@ class AssistantPipeline(Pipeline):
 
             # Step 4: Assemble all PCM chunks into a WAV
             wav_bytes = engine.pcm_to_wav(pcm_chunks)
-            total_time = time.time() - total_start
+            total_time = time.perf_counter() - total_start
             logger.info("[Assistant] Total: %.2fs", total_time)
 
             return Response(
@@ -130,22 +172,25 @@ class AssistantPipeline(Pipeline):
             """Receive audio WAV, return chunked audio response.
 
             Unlike /assistant/chat which waits for all sentences, this endpoint
-            streams WAV chunks as they are synthesized. The ESP32 can start
-            playback immediately after receiving the first chunk.
+            streams audio as it is synthesized. The ESP32 can start playback
+            immediately after receiving the first PCM chunk.
 
-            Response format: multipart WAV chunks separated by a 4-byte length
-            prefix (little-endian uint32) before each chunk.
+            Response format: a single WAV header followed by raw PCM chunks,
+            each preceded by a 4-byte length prefix (little-endian uint32).
+            The header's RIFF/data sizes are 0xFFFFFFFF (unknown length).
 
             Protocol:
-            [4 bytes: chunk_length_LE][chunk_length bytes: WAV data]
-            [4 bytes: chunk_length_LE][chunk_length bytes: WAV data]
+            [4 bytes: 44][44 bytes: WAV header, mono 16-bit]
+            [4 bytes: chunk_length_LE][chunk_length bytes: raw PCM]
+            [4 bytes: chunk_length_LE][chunk_length bytes: raw PCM]
             ...
             [4 bytes: 0x00000000]  <- end marker
             """
-            audio_bytes = await audio.read()
             loop = asyncio.get_running_loop()
 
-            text = await loop.run_in_executor(None, engine.transcribe, audio_bytes)
+            text = await loop.run_in_executor(
+                engine.executor, engine.transcribe, audio.file
+            )
             if not text or not text.strip():
                 raise HTTPException(status_code=400, detail="No speech detected")
 
@@ -153,24 +198,72 @@ class AssistantPipeline(Pipeline):
             messages = convo.get_messages(text)
 
             async def audio_chunk_generator():
-                """Generate WAV chunks as the LLM produces sentences."""
+                """Yield PCM chunks as soon as each sentence is synthesized.
+
+                An LLM thread feeds sentences to a synthesis task on the
+                event loop, which runs Piper on the executor and hands each
+                chunk to a bounded asyncio.Queue, so the first chunk reaches
+                the ESP32 while later sentences are still being generated.
+                Waiting for a slow client happens on the loop, never on an
+                executor worker.
+                """
                 full_response_parts = []
+                sentences: asyncio.Queue[str | None] = asyncio.Queue()
+                chunks: asyncio.Queue[tuple[str, bytes] | None] = asyncio.Queue(maxsize=4)
+                cancelled = threading.Event()
 
-                async with llm_lock:
-                    def generate_chunks():
-                        chunks = []
+                def produce():
+                    try:
                         for sentence in engine.generate_stream(messages):
-                            wav = engine.synthesize(sentence)
-                            chunks.append((sentence, wav))
-                        return chunks
-
-                    results = await loop.run_in_executor(None, generate_chunks)
-
-                for sentence, wav_bytes in results:
-                    full_response_parts.append(sentence)
-                    # Length-prefixed binary protocol
-                    length = len(wav_bytes)
-                    yield struct.pack("<I", length) + wav_bytes
+                            if cancelled.is_set():
+                                break
+                            loop.call_soon_threadsafe(sentences.put_nowait, sentence)
+                    finally:
+                        loop.call_soon_threadsafe(sentences.put_nowait, None)
+
+                async def synthesize():
+                    try:
+                        while (sentence := await sentences.get()) is not None:
+                            pcm = await loop.run_in_executor(
+                                engine.executor, engine.synthesize_raw, sentence
+                            )
+                            # Waits while the queue is full (backpressure)
+                            await chunks.put((sentence, pcm))
+                    finally:
+                        # Wake the consumer, unless it is gone and has
+                        # cancelled this task
+                        if not cancelled.is_set():
+                            await chunks.put(None)
+
+                # One WAV header for the whole stream
+                header = engine.stream_wav_header()
+                yield struct.pack("<I", len(header)) + header
+
+                # llm_lock covers LLM decoding only; it is released when the
+                # producer finishes, even if TTS and the client lag behind
+                await llm_lock.acquire()
+                producer = loop.run_in_executor(engine.executor, produce)
+                producer.add_done_callback(lambda _: llm_lock.release())
+                # Retrieve its outcome even if the client disconnects before
+                # it is awaited below, so a failure is not reported as
+                # "Future exception was never retrieved"
+                producer.add_done_callback(lambda f: f.cancelled() or f.exception())
+                synthesizer = asyncio.create_task(synthesize())
+                try:
+                    while (item := await chunks.get()) is not None:
+                        sentence, pcm = item
+                        full_response_parts.append(sentence)
+                        # Length-prefixed binary protocol; an empty chunk
+                        # would read as the end marker, so skip it
+                        if pcm:
+                            yield struct.pack("<I", len(pcm)) + pcm
+                    await producer  # Propagate worker errors
+                    await synthesizer
+                finally:
+                    # Client gone or error: stop the LLM thread after its
+                    # current sentence and drop the synthesis task
+                    cancelled.set()
+                    synthesizer.cancel()
 
                 # End marker
                 yield struct.pack("<I", 0)
@@ -190,17 +283,18 @@ class AssistantPipeline(Pipeline):
         @app.post("/assistant/chat/text")
         async def assistant_chat_text(audio: UploadFile = File(...)):
             """Same as /assistant/chat but returns JSON. Useful for debugging."""
-            audio_bytes = await audio.read()
             loop = asyncio.get_running_loop()
 
-            text = await loop.run_in_executor(None, engine.transcribe, audio_bytes)
+            text = await loop.run_in_executor(
+                engine.executor, engine.transcribe, audio.file
+            )
             if not text or not text.strip():
                 raise HTTPException(status_code=400, detail="No speech detected")
 
             messages = convo.get_messages(text)
             async with llm_lock:
                 response_text = await loop.run_in_executor(
-                    None, lambda: engine.generate(messages, json_mode=False)
+                    engine.executor, lambda: engine.generate(messages, json_mode=False)
                 )
 
             convo.add_exchange(text, response_text)
@@ -12,12 +12,11 @@ Endpoints:
 from __future__ import annotations
 
 import asyncio
-import json
 import time
 import logging
 
-from fastapi import FastAPI, UploadFile, File, HTTPException
-from fastapi.responses import JSONResponse
+import orjson
+from fastapi import FastAPI, UploadFile, File, HTTPException, Response
 
 from app.pipeline import Pipeline
 from app.engine import InferenceEngine
@@ -64,6 +63,27 @@ _DEFAULT_SYSTEM_PROMPT = (
     '/no_think'
 )
 
+# Grammar for the LLM fallback: only the exact actions schema the ESP32
+# parses, with known action and param names and no optional whitespace.
+# Compared to generic JSON mode the model cannot emit extra keys or prose,
+# which keeps responses short — on the Pi every decoded token costs ~200ms.
+_ROBOT_GBNF = r"""
+root   ::= "{\"actions\":[" action ("," action)* "]}"
+action ::= "{\"action\":\"" name "\",\"params\":{" (param ("," param)*)? "}}"
+name   ::= "move" | "turn" | "stop" | "sleep" | "wake" | "dance" | "grab" |
+           "release" | "look_up" | "look_down" | "unknown"
+param  ::= "\"" key "\":" value
+key    ::= "direction" | "distance" | "angle" | "original"
+value  ::= number | string
+number ::= "-"? [0-9]+ ("." [0-9]+)?
+string ::= "\"" ([^"\\\x7F\x00-\x1F] | "\\" ["\\/bfnrt])* "\""
+"""
+
+
+def _json_response(content: dict) -> Response:
+    """Serialize with orjson (much faster than the stdlib encoder)."""
+    return Response(content=orjson.dumps(content), media_type="application/json")
+
 
 class RobotPipeline(Pipeline):
     """Keyword-first robot command pipeline with LLM fallback."""
@@ -81,6 +101,11 @@ class RobotPipeline(Pipeline):
         llm_lock: asyncio.Lock,
     ) -> None:
 
+        robot_grammar = engine.compile_grammar(_ROBOT_GBNF)
+        # Route a compound command once at startup so the first real one
+        # does not pay one-off costs (replacement templates, caches)
+        route_command("avanza dos metros y gira a la derecha")
+
         @app.post("/robot/command")
         async def robot_command(audio: UploadFile = File(...)):
             """Receive audio WAV, return JSON command.
@@ -92,14 +117,15 @@ class RobotPipeline(Pipeline):
 
             The keyword router handles ~80% of common commands instantly.
             """
-            total_start = time.time()
-            audio_bytes = await audio.read()
+            total_start = time.perf_counter()
             loop = asyncio.get_running_loop()
 
             # Step 1: ASR
-            asr_start = time.time()
-            text = await loop.run_in_executor(None, engine.transcribe, audio_bytes)
-            asr_time = time.time() - asr_start
+            asr_start = time.perf_counter()
+            text = await loop.run_in_executor(
+                engine.executor, engine.transcribe, audio.file
+            )
+            asr_time = time.perf_counter() - asr_start
 
             if not text or not text.strip():
                 raise HTTPException(status_code=400, detail="No speech detected")
@@ -111,15 +137,15 @@ class RobotPipeline(Pipeline):
 
             if router_result is not None:
                 # Fast path — resolved by keywords
-                total_time = time.time() - total_start
+                total_time = time.perf_counter() - total_start
                 logger.info("[Robot] KEYWORD (%.4fs): %s -> %s",
                              total_time - asr_time, text,
                              [a.action for a in router_result.actions])
 
                 actions_data = router_result.to_actions_json()
-                convo.add_exchange(text, json.dumps(actions_data, ensure_ascii=False))
+                convo.add_exchange(text, orjson.dumps(actions_data).decode())
 
-                return JSONResponse(content={
+                return _json_response({
                     "transcription": text,
                     **actions_data,
                     "confirmation": router_result.confirmation,
@@ -133,28 +159,28 @@ class RobotPipeline(Pipeline):
 
             # Step 3: LLM fallback for complex commands
             messages = convo.get_messages(text)
-            llm_start = time.time()
+            llm_start = time.perf_counter()
             async with llm_lock:
                 response_text = await loop.run_in_executor(
-                    None, lambda: engine.generate(messages, json_mode=True)
+                    engine.executor, lambda: engine.generate(messages, grammar=robot_grammar)
                 )
-            llm_time = time.time() - llm_start
+            llm_time = time.perf_counter() - llm_start
 
             logger.info("[Robot] LLM (%.2fs): %s", llm_time, response_text[:120])
             convo.add_exchange(text, response_text)
 
             try:
-                command_data = json.loads(response_text)
+                command_data = orjson.loads(response_text)
                 # Ensure the LLM response has the expected structure
                 if "actions" not in command_data:
                     command_data = {"actions": [command_data]}
-            except json.JSONDecodeError:
+            except orjson.JSONDecodeError:
                 command_data = {"actions": [{"action": "error", "params": {"raw": response_text}}]}
 
-            total_time = time.time() - total_start
+            total_time = time.perf_counter() - total_start
             logger.info("[Robot] Total pipeline: %.2fs", total_time)
 
-            return JSONResponse(content={
+            return _json_response({
                 "transcription": text,
                 **command_data,
                 "_routed_by": "llm",
@@ -60,7 +60,6 @@ Environment="PATH=$VENV_PATH/bin:/usr/bin"
 Environment="PYTHONUNBUFFERED=1"
 Environment="OMP_NUM_THREADS=3"
 Environment="OPENBLAS_NUM_THREADS=3"
-Environment="GOMP_CPU_AFFINITY=0-2"
 ExecStart=$VENV_PATH/bin/uvicorn app.main:app \\
     --host 0.0.0.0 --port 8080 --workers 1 --log-level info
 Restart=always
@@ -0,0 +1,113 @@
+"""Tests unitarios para la persistencia del historial de conversacion.
+
+Usan un directorio temporal (tmp_path) como HISTORY_FILE. Las escrituras
+pasan por el hilo de fondo, asi que se espera a flush_history() antes de
+leer el fichero.
+"""
+
+import orjson
+
+from app.conversation import ConversationManager, _write_batch, flush_history
+
+
+def _lines(*messages):
+    return b"".join(orjson.dumps(m) + b"\n" for m in messages)
+
+
+def _read(path):
+    return [orjson.loads(line) for line in path.read_bytes().splitlines()]
+
+
+def _msg(role, content):
+    return {"role": role, "content": content}
+
+
+class TestLoad:
+    """Carga del fichero JSONL al arrancar."""
+
+    def test_linea_cortada_se_ignora_y_se_compacta(self, tmp_path):
+        path = tmp_path / "history.robot.jsonl"
+        good = [_msg("user", "hola"), _msg("assistant", "que tal")]
+        path.write_bytes(_lines(*good) + b'{"role": "us')
+
+        convo = ConversationManager("robot", "prompt",
+                                    persist_path=str(tmp_path / "history.json"))
+        assert list(convo.history) == good
+
+        flush_history()
+        assert _read(path) == good
+
+    def test_append_tras_linea_cortada(self, tmp_path):
+        path = tmp_path / "history.robot.jsonl"
+        path.write_bytes(_lines(_msg("user", "hola")) + b'{"role": "us')
+
+        convo = ConversationManager("robot", "prompt",
+                                    persist_path=str(tmp_path / "history.json"))
+        convo.add_exchange("avanza", "Avanzando")
+
+        flush_history()
+        assert _read(path) == [_msg("user", "hola"), _msg("user", "avanza"),
+                               _msg("assistant", "Avanzando")]
+
+    def test_compacta_a_la_ventana(self, tmp_path):
+        path = tmp_path / "history.robot.jsonl"
+        messages = [_msg("user" if i % 2 == 0 else "assistant", str(i))
+                    for i in range(6)]
+        path.write_bytes(_lines(*messages))
+
+        convo = ConversationManager("robot", "prompt", max_turns=1,
+                                    persist_path=str(tmp_path / "history.json"))
+        assert list(convo.history) == messages[-2:]
+
+        flush_history()
+        assert _read(path) == messages[-2:]
+
+
+class TestLegacyImport:
+    """Importacion del antiguo fichero JSON compartido por proyectos."""
+
+    def test_importa_una_sola_vez(self, tmp_path):
+        legacy = tmp_path / "history.json"
+        robot = [_msg("user", "avanza"), _msg("assistant", "Avanzando")]
+        legacy.write_bytes(orjson.dumps({
+            "robot": robot,
+            "assistant": [_msg("user", "hola"), _msg("assistant", "Hola")],
+        }))
+
+        convo = ConversationManager("robot", "prompt", persist_path=str(legacy))
+        assert list(convo.history) == robot
+
+        flush_history()
+        path = tmp_path / "history.robot.jsonl"
+        assert _read(path) == robot
+        # El fichero antiguo se conserva para los demas proyectos
+        assert legacy.exists()
+
+        # Con el JSONL ya creado, el fichero antiguo no se vuelve a leer
+        legacy.write_bytes(orjson.dumps({"robot": [_msg("user", "otro")]}))
+        convo = ConversationManager("robot", "prompt", persist_path=str(legacy))
+        assert list(convo.history) == robot
+
+
+class TestWriteBatch:
+    """Agrupacion de escrituras pendientes por fichero."""
+
+    def test_append_tras_truncate_se_conserva(self, tmp_path):
+        path = tmp_path / "history.robot.jsonl"
+        path.write_bytes(b"viejo\n")
+        _write_batch([(path, b"a\n", True), (path, b"b\n", False)])
+        assert path.read_bytes() == b"a\nb\n"
+
+    def test_truncate_descarta_appends_anteriores(self, tmp_path):
+        path = tmp_path / "history.robot.jsonl"
+        path.write_bytes(b"viejo\n")
+        _write_batch([(path, b"a\n", False), (path, b"b\n", True)])
+        assert path.read_bytes() == b"b\n"
+
+    def test_ficheros_independientes(self, tmp_path):
+        robot = tmp_path / "history.robot.jsonl"
+        assistant = tmp_path / "history.assistant.jsonl"
+        robot.write_bytes(b"r\n")
+        _write_batch([(robot, b"a\n", False), (assistant, b"b\n", True)])
+        assert robot.read_bytes() == b"r\na\n"
+        assert assistant.read_bytes() == b"b\n"
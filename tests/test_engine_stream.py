@@ -0,0 +1,50 @@
+"""Tests unitarios para InferenceEngine.generate_stream.
+
+Sustituyen el modelo por un LLM falso cuyo create_chat_completion
+devuelve los tokens dados en el formato de chunks de llama-cpp-python.
+"""
+
+from app.engine import InferenceEngine
+
+
+class FakeLLM:
+    def __init__(self, tokens):
+        self.tokens = tokens
+
+    def create_chat_completion(self, **kwargs):
+        assert kwargs["stream"] is True
+        return ({"choices": [{"delta": {"content": token}}]}
+                for token in self.tokens)
+
+
+def _stream(*tokens):
+    engine = InferenceEngine()
+    engine.llm = FakeLLM(list(tokens))
+    return list(engine.generate_stream([{"role": "user", "content": "hola"}]))
+
+
+class TestSentences:
+    """Division en frases."""
+
+    def test_varias_frases_en_un_token(self):
+        assert _stream("Uno. Dos! Tres? Cuatro") == ["Uno.", "Dos!", "Tres?", "Cuatro"]
+
+    def test_frase_en_varios_tokens(self):
+        assert _stream("Ho", "la", " mundo", ".", " Adios") == ["Hola mundo.", "Adios"]
+
+    def test_tokens_vacios(self):
+        assert _stream("", "Hola.", "") == ["Hola."]
+
+
+class TestThink:
+    """Eliminacion de bloques <think>."""
+
+    def test_bloque_completo(self):
+        assert _stream("<think>Pienso. Mucho.</think>Hola.") == ["Hola."]
+
+    def test_etiquetas_partidas_entre_tokens(self):
+        tokens = ["<th", "ink>Pienso", ". Mas.</th", "ink>", "Hola", ". Adios."]
+        assert _stream(*tokens) == ["Hola.", "Adios."]
+
+    def test_bloque_sin_cerrar(self):
+        assert _stream("Hola. ", "<think>Pienso. Sin", " cerrar") == ["Hola."]
@@ -88,6 +88,18 @@ class TestMoveForward:
         assert result.actions[0].params["direction"] == "forward"
         assert result.actions[0].params["distance"] == 3
 
+    def test_avanza_decimal_coma(self):
+        result = route_command("avanza 0,5 metros")
+        assert result is not None
+        assert result.actions[0].action == "move"
+        assert result.actions[0].params["distance"] == 0.5
+
+    def test_avanza_decimal_punto(self):
+        result = route_command("avanza 1.5 metros")
+        assert result is not None
+        assert result.actions[0].action == "move"
+        assert result.actions[0].params["distance"] == 1.5
+
     def test_ve_hacia_adelante(self):
         result = route_command("ve hacia adelante")
         assert result is not None
@@ -193,6 +205,20 @@ class TestTurn:
         assert result.actions[0].params["direction"] == "right"
         assert result.actions[0].params["angle"] == 45
 
+    def test_gira_cuarenta_y_cinco_grados(self):
+        result = route_command("gira cuarenta y cinco grados a la izquierda")
+        assert result is not None
+        assert len(result.actions) == 1
+        assert result.actions[0].params["direction"] == "left"
+        assert result.actions[0].params["angle"] == 45
+
+    def test_gira_treinta_y_cinco_grados(self):
+        result = route_command("gira treinta y cinco grados a la derecha")
+        assert result is not None
+        assert len(result.actions) == 1
+        assert result.actions[0].params["direction"] == "right"
+        assert result.actions[0].params["angle"] == 35
+
     def test_gira_180_grados(self):
         result = route_command("gira 180 grados")
         assert result is not None
@@ -216,6 +242,17 @@ class TestTurn:
         assert result.actions[0].action == "turn"
         assert result.actions[0].params["angle"] == 180
 
+    def test_cuarto_de_vuelta(self):
+        result = route_command("da un cuarto de vuelta")
+        assert result is not None
+        assert result.actions[0].action == "turn"
+        assert result.actions[0].params["angle"] == 90
+
+    def test_vuelta_completa_no_gana_a_coge(self):
+        result = route_command("vuelta completa coge")
+        assert result is not None
+        assert result.actions[0].action == "grab"
+
     def test_tuerce_izquierda(self):
         result = route_command("tuerce a la izquierda")
         assert result is not None
@@ -288,6 +325,14 @@ class TestDance:
 class TestCompound:
     """Comandos compuestos — generan multiples acciones."""
 
+    def test_cuarenta_y_gira(self):
+        result = route_command("avanza cuarenta y gira a la izquierda")
+        assert result is not None
+        assert len(result.actions) == 2
+        assert result.actions[0].action == "move"
+        assert result.actions[1].action == "turn"
+        assert result.actions[1].params["direction"] == "left"
+
     def test_avanza_y_gira(self):
         result = route_command("avanza dos metros y gira a la derecha")
         assert result is not None
@@ -328,6 +373,19 @@ class TestCompound:
         assert result.actions[1].params["direction"] == "forward"
         assert result.actions[1].params["distance"] == 3
 
+    def test_coma_sin_espacio(self):
+        result = route_command("avanza, gira")
+        assert result is not None
+        assert len(result.actions) == 2
+        assert result.actions[0].action == "move"
+        assert result.actions[1].action == "turn"
+
+    def test_coma_decimal_no_separa(self):
+        result = route_command("avanza 0,5 metros")
+        assert result is not None
+        assert len(result.actions) == 1
+        assert result.actions[0].params["distance"] == 0.5
+
     def test_triple_compound(self):
         result = route_command("avanza, gira a la derecha y avanza otra vez")
         assert result is not None
@@ -384,3 +442,20 @@ class TestNoMatch:
     def test_que_hora_es(self):
         result = route_command("qué hora es")
         assert result is None
+
+    def test_texto_demasiado_largo(self):
+        result = route_command("avanza " + "muy " * 60 + "despacio")
+        assert result is None
+
+
+class TestCache:
+    """Textos equivalentes reutilizan el resultado cacheado."""
+
+    def test_mismo_resultado_normalizado(self):
+        result = route_command("Gira a la  derecha ")
+        assert result is not None
+        assert result is route_command("gira a la derecha")
+
+    def test_no_match_cacheado(self):
+        assert route_command("qué hora es") is None
+        assert route_command("Qué hora es") is None